@@ -3,35 +3,74 @@
 hccli - simple local healthcheck CLI
 Dead man's switch for cron jobs and scheduled tasks.
 """
+# subprocess, datetime and the thread pool are imported inside the handlers
+# that need them: the hot status path (cron, widgets) shouldn't pay their
+# import cost on every invocation.
+import copy
 import json
 import os
-import subprocess
 import sys
 import time
-import re
 from pathlib import Path
-from datetime import datetime, timedelta
 
 CONFIG_DIR = Path.home() / ".config" / "hccli"
 CHECKS_FILE = CONFIG_DIR / "checks.json"
+SYSTEMD_USER_DIR = Path.home() / ".config" / "systemd" / "user"
 
 # State/log lives under XDG_STATE_HOME or ~/.local/state
 STATE_DIR = Path(os.environ.get("XDG_STATE_HOME", Path.home() / ".local" / "state")) / "hccli"
 LOG_FILE = STATE_DIR / "run.log"
 LOG_ROTATE_AT_BYTES = 1_000_000  # rotate when log exceeds ~1MB
 
+# Use orjson for the checks file when it's installed (2-5x faster both
+# directions, emits bytes directly); stdlib json otherwise. Not a declared
+# dependency -- hccli must keep working from a bare pipx install.
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+
+# Memoize the parsed checks file per process, keyed on mtime, so repeated
+# load_checks() calls in one invocation (or a long-lived wrapper) don't
+# re-read and re-parse the JSON. Deep-copied on return so callers mutating
+# check dicts (run_check does) can't poison the cache.
+_checks_cache = {"mtime": None, "data": None}
+
 
 def load_checks():
-    if not CHECKS_FILE.exists():
+    # One stat serves both the existence check and the cache key, and
+    # read_bytes + loads parses in one gulp instead of json.load's many
+    # small reads.
+    try:
+        mtime = os.stat(CHECKS_FILE).st_mtime
+    except FileNotFoundError:
         return {}
-    with open(CHECKS_FILE) as f:
-        return json.load(f)
+    if _checks_cache["mtime"] != mtime:
+        _checks_cache["data"] = _json_loads(CHECKS_FILE.read_bytes())
+        _checks_cache["mtime"] = mtime
+    return copy.deepcopy(_checks_cache["data"])
 
 
 def save_checks(checks):
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    with open(CHECKS_FILE, "w") as f:
-        json.dump(checks, f, indent=2)
+    # Write to a temp file and rename into place so a crash mid-write can't
+    # leave a truncated checks.json. Compact separators: nobody reads this
+    # file by hand often enough to justify doubling its size with indent.
+    tmp = CHECKS_FILE.with_suffix(".json.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_json_dumps(checks))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, CHECKS_FILE)
+    # Invalidate rather than update: the next load re-reads what was written.
+    _checks_cache["mtime"] = None
 
 
 # --- Logging ---
@@ -52,6 +91,7 @@ def log_event(event, name=None, detail=None):
     Format: ISO-8601 timestamp TAB event TAB name TAB detail
     Using TAB so we can reliably grep/split, even when detail contains spaces.
     """
+    from datetime import datetime
     try:
         STATE_DIR.mkdir(parents=True, exist_ok=True)
         _rotate_log_if_needed()
@@ -82,6 +122,7 @@ def read_log_lines():
 
 def parse_log_timestamp(ts):
     """Parse the ISO timestamps we write. Returns datetime or None."""
+    from datetime import datetime
     try:
         return datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S%z")
     except ValueError:
@@ -89,63 +130,100 @@ def parse_log_timestamp(ts):
 
 
 # --- Duration helpers ---
+_UNIT_SECS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
 def parse_duration(s):
-    """Parse '25h', '1d', '30m', '1d12h' etc into seconds"""
+    """Parse '25h', '1d', '30m', '1d12h' etc into seconds.
+
+    A bare number means hours. Anything else must be digits+unit pairs;
+    strings like 'X3hY' are rejected instead of silently half-parsed.
+    """
+    # Hand-rolled scanner instead of a regex: these strings are tiny and
+    # parsed on every invocation, so regex setup cost dominates.
+    stripped = s.strip()
+    # isdecimal, not isdigit: isdigit is true for superscript/circled
+    # digits that int() rejects, which would traceback instead of erroring.
+    if stripped.isdecimal():
+        return int(stripped) * 3600
     total = 0
-    for match in re.finditer(r"(\d+)\s*([smhdw])", s.lower()):
-        val = int(match.group(1))
-        unit = match.group(2)
-        if unit == "s":
-            total += val
-        elif unit == "m":
-            total += val * 60
-        elif unit == "h":
-            total += val * 3600
-        elif unit == "d":
-            total += val * 86400
-        elif unit == "w":
-            total += val * 604800
-    if total == 0:
-        try:
-            total = int(s) * 3600
-        except ValueError:
-            print(f"Cannot parse duration: {s}", file=sys.stderr)
-            print("Examples: 30m, 1h, 25h, 1d, 1d12h, 1w", file=sys.stderr)
-            sys.exit(1)
+    i = 0
+    n = len(stripped)
+    valid = n > 0
+    while i < n:
+        if not ("0" <= stripped[i] <= "9"):
+            valid = False  # expected a number
+            break
+        val = 0
+        while i < n and "0" <= stripped[i] <= "9":
+            val = val * 10 + (ord(stripped[i]) - 48)
+            i += 1
+        while i < n and stripped[i].isspace():
+            i += 1
+        if i >= n:
+            valid = False  # dangling number with no unit
+            break
+        mult = _UNIT_SECS.get(stripped[i].lower())
+        if mult is None:
+            valid = False  # unknown unit
+            break
+        total += val * mult
+        i += 1
+    if not valid or total == 0:
+        print(f"Cannot parse duration: {s}", file=sys.stderr)
+        print("Examples: 30m, 1h, 25h, 1d, 1d12h, 1w", file=sys.stderr)
+        sys.exit(1)
     return total
 
 
-def format_duration(seconds):
-    if seconds < 60:
-        return f"{seconds}s"
-    elif seconds < 3600:
-        return f"{seconds // 60}m"
-    elif seconds < 86400:
-        h = seconds // 3600
-        m = (seconds % 3600) // 60
-        if m:
-            return f"{h}h{m}m"
-        return f"{h}h"
-    else:
-        d = seconds // 86400
-        h = (seconds % 86400) // 3600
-        if h:
-            return f"{d}d{h}h"
-        return f"{d}d"
+# (threshold, divisor, suffix, sub_divisor, sub_suffix) per tier; a None
+# threshold is the catch-all. Tiers with a sub_divisor show one finer unit
+# when it's non-zero ("1h30m", "2d6h").
+_FMT_TIERS = (
+    (60, 1, "s", None, ""),
+    (3600, 60, "m", None, ""),
+    (86400, 3600, "h", 60, "m"),
+    (None, 86400, "d", 3600, "h"),
+)
 
 
-def format_ago(epoch):
+def format_duration(seconds):
+    for threshold, divisor, suffix, sub_divisor, sub_suffix in _FMT_TIERS:
+        if threshold is None or seconds < threshold:
+            primary, remainder = divmod(seconds, divisor)
+            out = f"{primary}{suffix}"
+            if sub_divisor:
+                sub = remainder // sub_divisor
+                if sub:
+                    out += f"{sub}{sub_suffix}"
+            return out
+
+
+def format_ago(epoch, now):
     if epoch is None:
         return "never"
-    diff = int(time.time() - epoch)
+    diff = int(now - epoch)
     if diff < 0:
         return "just now"
     return format_duration(diff) + " ago"
 
 
 # --- Status ---
-def check_status(check):
-    """Returns (ok, message)"""
+def check_ok(check, now):
+    """Boolean-only version of check_status for the --quiet path: same
+    verdict, none of the message formatting."""
+    last_ok = check.get("last_ok")
+    last_fail = check.get("last_fail")
+    if last_fail and (not last_ok or last_fail > last_ok):
+        return False
+    if last_ok is None:
+        return False
+    return now - last_ok <= check.get("every")
+
+
+def check_status(check, now):
+    """Returns (ok, message). Takes the caller's clock reading so a status
+    pass over many checks costs one time.time() call, not two per check."""
     last_ok = check.get("last_ok")
     last_fail = check.get("last_fail")
     every = check.get("every")
@@ -154,11 +232,11 @@ def check_status(check):
         return False, f"FAILED: {msg}"
     if last_ok is None:
         return False, "never run"
-    age = time.time() - last_ok
+    age = now - last_ok
     if age > every:
         overdue = age - every
         return False, f"OVERDUE {format_duration(int(overdue))}"
-    return True, format_ago(check.get("service_ran", last_ok))
+    return True, format_ago(check.get("service_ran", last_ok), now)
 
 
 # --- Commands ---
@@ -236,6 +314,7 @@ def cmd_rm(args):
 
 def run_check(name, check):
     """Run a single check command, return (ok, message)"""
+    import subprocess
     now = time.time()
     check["last_run"] = now
 
@@ -279,29 +358,41 @@ def run_check(name, check):
         return False, str(e)
 
 
+def parse_systemd_timestamp(ts):
+    """Parse systemd's 'Mon 2024-01-15 10:30:45 UTC' format into an epoch.
+
+    systemd prints the local timezone abbreviation, which strptime %Z cannot
+    reliably parse, so drop the weekday and zone and treat the middle as
+    local time (which is what systemd printed).
+    """
+    from datetime import datetime
+    parts = ts.split()
+    return datetime.strptime(" ".join(parts[1:3]), "%Y-%m-%d %H:%M:%S").timestamp()
+
+
 def run_sdtimer_check(name, check, service, now):
     """Check a systemd user service ran successfully and recently"""
+    import subprocess
     every = check["every"]
     try:
+        # One systemctl call for both properties: each show is a fork plus
+        # a D-Bus round-trip, and show accepts multiple -p flags.
         r = subprocess.run(
-            ["systemctl", "--user", "show", "-p", "Result", "--value", f"{service}.service"],
+            ["systemctl", "--user", "show", "-p", "Result", "-p", "ExecMainExitTimestamp",
+             f"{service}.service"],
             capture_output=True, text=True,
         )
-        result = r.stdout.strip()
-        r = subprocess.run(
-            ["systemctl", "--user", "show", "-p", "ExecMainExitTimestamp", "--value", f"{service}.service"],
-            capture_output=True, text=True,
-        )
-        timestamp_str = r.stdout.strip()
+        props = {}
+        for line in r.stdout.splitlines():
+            key, _, value = line.partition("=")
+            props[key] = value
+        result = props.get("Result", "")
+        timestamp_str = props.get("ExecMainExitTimestamp", "").strip()
         if not timestamp_str:
             check["last_fail"] = now
             check["fail_msg"] = "never run"
             return False, "never run"
-        r = subprocess.run(
-            ["date", "-d", timestamp_str, "+%s"],
-            capture_output=True, text=True,
-        )
-        epoch = int(r.stdout.strip())
+        epoch = int(parse_systemd_timestamp(timestamp_str))
         age = now - epoch
         if result != "success":
             check["last_fail"] = now
@@ -315,7 +406,7 @@ def run_sdtimer_check(name, check, service, now):
         check["last_fail"] = None
         check["fail_msg"] = None
         check["service_ran"] = epoch
-        return True, f"ok (ran {format_ago(epoch)})"
+        return True, f"ok (ran {format_ago(epoch, now)})"
     except Exception as e:
         check["last_fail"] = now
         check["fail_msg"] = str(e)
@@ -337,7 +428,10 @@ def cmd_run(args):
 
     log_event("run-start", detail=f"force={force} filter={','.join(names) if names else '*'}")
 
-    for name, check in sorted(checks.items()):
+    # No sort here: run order isn't user-facing the way status/list output
+    # is, and dict order is already stable within a config file.
+    due = []
+    for name, check in checks.items():
         if names and name not in names:
             log_event("filtered", name=name)
             continue
@@ -350,15 +444,27 @@ def cmd_run(args):
                           detail=f"ran {format_duration(age)} ago, every={format_duration(every)}")
                 skipped += 1
                 continue
-        ran += 1
-        ok, msg = run_check(name, check)
-        icon = "✅" if ok else "❌"
-        print(f"{icon} {name}: {msg}")
-        log_event("ran-ok" if ok else "ran-fail", name=name, detail=msg)
-        if not ok:
-            failed += 1
-
-    save_checks(checks)
+        due.append((name, check))
+
+    if due:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Checks are subprocess-bound, so threads overlap their waits; total
+        # wall time becomes the slowest check instead of the sum. Each worker
+        # mutates only its own check dict, so no locking is needed. Printing
+        # and logging happen afterwards, in order, from this thread.
+        with ThreadPoolExecutor(max_workers=min(16, len(due))) as ex:
+            results = list(ex.map(lambda item: run_check(item[0], item[1]), due))
+        for (name, check), (ok, msg) in zip(due, results):
+            ran += 1
+            icon = "✅" if ok else "❌"
+            print(f"{icon} {name}: {msg}")
+            log_event("ran-ok" if ok else "ran-fail", name=name, detail=msg)
+            if not ok:
+                failed += 1
+        # Only checks that actually ran mutate state; skip the rewrite when
+        # nothing was due so an idle cron run doesn't touch the file at all.
+        save_checks(checks)
     log_event("run-end", detail=f"ran={ran} skipped={skipped} failed={failed}")
 
     if ran == 0 and not names:
@@ -373,11 +479,19 @@ def cmd_status(args):
         if not quiet:
             print("No checks configured. Add one: hccli add --every <duration> <command>")
         return
+    now = time.time()
+    if quiet and not oneline:
+        # Exit-code-only mode: no sorting, no formatting, stop at the
+        # first failure. This is the path cron and widgets hammer.
+        for check in checks.values():
+            if not check_ok(check, now):
+                sys.exit(1)
+        return
     ok_count = 0
     fail_count = 0
     fail_names = []
     for name, check in sorted(checks.items()):
-        ok, msg = check_status(check)
+        ok, msg = check_status(check, now)
         if ok:
             ok_count += 1
         else:
@@ -402,6 +516,7 @@ def cmd_status(args):
 
 
 def cmd_list(args):
+    from datetime import datetime
     checks = load_checks()
     if not checks:
         print("No checks configured.")
@@ -455,6 +570,7 @@ def cmd_reset(args):
 
 def cmd_log(args):
     """Show recent hccli run log entries."""
+    from datetime import datetime, timedelta
     days = 2
     n = None
     follow = False
@@ -527,6 +643,7 @@ def cmd_log(args):
 def cmd_install(args):
     """Install systemd user timer to run hccli run"""
     import shutil
+    import subprocess
     every = "5m"
     i = 0
     while i < len(args):
@@ -547,10 +664,9 @@ def cmd_install(args):
     hccli_path = shutil.which("hccli")
     if not hccli_path:
         hccli_path = sys.argv[0]
-    unit_dir = Path.home() / ".config" / "systemd" / "user"
-    unit_dir.mkdir(parents=True, exist_ok=True)
-    service = unit_dir / "hccli.service"
-    timer = unit_dir / "hccli.timer"
+    SYSTEMD_USER_DIR.mkdir(parents=True, exist_ok=True)
+    service = SYSTEMD_USER_DIR / "hccli.service"
+    timer = SYSTEMD_USER_DIR / "hccli.timer"
     service.write_text(f"""[Unit]
 Description=Run hccli healthchecks
 [Service]
@@ -577,10 +693,10 @@ WantedBy=timers.target
 
 
 def cmd_uninstall(args):
+    import subprocess
     subprocess.run(["systemctl", "--user", "disable", "--now", "hccli.timer"])
-    unit_dir = Path.home() / ".config" / "systemd" / "user"
     for f in ["hccli.service", "hccli.timer"]:
-        p = unit_dir / f
+        p = SYSTEMD_USER_DIR / f
         if p.exists():
             p.unlink()
     subprocess.run(["systemctl", "--user", "daemon-reload"])
@@ -629,25 +745,30 @@ def main():
         return
     cmd = sys.argv[1]
     args = sys.argv[2:]
-    commands = {
-        "add": cmd_add,
-        "rm": cmd_rm,
-        "remove": cmd_rm,
-        "run": cmd_run,
-        "status": cmd_status,
-        "list": cmd_list,
-        "ls": cmd_list,
-        "edit": cmd_edit,
-        "reset": cmd_reset,
-        "log": cmd_log,
-        "install": cmd_install,
-        "uninstall": cmd_uninstall,
-        "help": lambda a: show_help(),
-        "--help": lambda a: show_help(),
-        "-h": lambda a: show_help(),
-    }
-    if cmd in commands:
-        commands[cmd](args)
+    # Plain if/elif dispatch: no dict or lambdas built per invocation.
+    # (A match statement would read the same but needs Python 3.10.)
+    if cmd == "add":
+        cmd_add(args)
+    elif cmd in ("rm", "remove"):
+        cmd_rm(args)
+    elif cmd == "run":
+        cmd_run(args)
+    elif cmd == "status":
+        cmd_status(args)
+    elif cmd in ("list", "ls"):
+        cmd_list(args)
+    elif cmd == "edit":
+        cmd_edit(args)
+    elif cmd == "reset":
+        cmd_reset(args)
+    elif cmd == "log":
+        cmd_log(args)
+    elif cmd == "install":
+        cmd_install(args)
+    elif cmd == "uninstall":
+        cmd_uninstall(args)
+    elif cmd in ("help", "--help", "-h"):
+        show_help()
     else:
         print(f"Unknown command: {cmd}", file=sys.stderr)
         show_help()